@@ -2,17 +2,26 @@
 from __future__ import annotations
 
 import os
+import threading
 from dotenv import load_dotenv
 from functools import lru_cache
-from typing import Tuple
+from typing import Callable, Hashable, Tuple
 
-from flask import Flask, jsonify, request, render_template
+import orjson
+from cachetools import TTLCache
+from flask import Flask, Response, jsonify, request, render_template
 
-from .routing import risk_map_geojson, safest_route, alternative_routes
+from .routing import risk_map_geojson, round_coords, safest_route, alternative_routes
 
 load_dotenv()
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
+# Serialised route responses, keyed by endpoint + rounded coordinates. Also
+# advertised to browsers via Cache-Control so repeat clicks stay client-side.
+RESPONSE_TTL_SECONDS = 300
+_response_cache: TTLCache = TTLCache(maxsize=1024, ttl=RESPONSE_TTL_SECONDS)
+_response_cache_lock = threading.Lock()
+
 
 # ---------------------------------------------------------------------------
 # Config helpers
@@ -29,6 +38,22 @@ def _default_bbox() -> Tuple[float, float, float, float]:
     return north, south, east, west
 
 
+def _cached_json(key: Hashable, build: Callable[[], dict]) -> Response:
+    """Serve ``build()`` as JSON, reusing the serialised bytes for *key*."""
+    with _response_cache_lock:
+        payload = _response_cache.get(key)
+    if payload is None:
+        # route paths are float32 numpy arrays; orjson writes them natively
+        payload = orjson.dumps(build(), option=orjson.OPT_SERIALIZE_NUMPY)
+        with _response_cache_lock:
+            _response_cache[key] = payload
+    resp = Response(payload, mimetype="application/json")
+    resp.cache_control.public = True
+    resp.cache_control.max_age = RESPONSE_TTL_SECONDS
+    resp.add_etag()
+    return resp.make_conditional(request)
+
+
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
@@ -66,15 +91,19 @@ def routes() -> tuple:  # type: ignore[override]
         elat, elon = map(float, end.split(","))
     except ValueError:
         return jsonify({"error": "Invalid coordinates"}), 400
-    try:
+
+    def build() -> dict:
         routes = alternative_routes(slat, slon, elat, elon, k)
+        return {
+            "routes": [
+                {"path": coords, "total_risk": risk} for coords, risk in routes
+            ]
+        }
+
+    try:
+        return _cached_json(("routes", *round_coords(slat, slon, elat, elon), k), build)
     except Exception as exc:
         return jsonify({"error": str(exc)}), 500
-    return jsonify({
-        "routes": [
-            {"path": coords, "total_risk": risk} for coords, risk in routes
-        ]
-    })
 
 @app.route("/route")
 def route() -> tuple:  # type: ignore[override]
@@ -89,13 +118,15 @@ def route() -> tuple:  # type: ignore[override]
     except ValueError:
         return jsonify({"error": "Invalid coordinates"}), 400
 
-    try:
+    def build() -> dict:
         path, risk = safest_route(slat, slon, elat, elon)
+        return {"path": path, "total_risk": risk}
+
+    try:
+        return _cached_json(("route", *round_coords(slat, slon, elat, elon)), build)
     except Exception as exc:  # pragma: no cover
         return jsonify({"error": str(exc)}), 500
 
-    return jsonify({"path": path, "total_risk": risk})
-
 
 @app.route("/riskmap")
 def riskmap() -> tuple:  # type: ignore[override]
@@ -22,19 +22,26 @@ names (can be changed below):
     population_density.tif       – raster of persons/km², will be rescaled
     shelters.geojson             – Point safe zones
 
+A GeoParquet sibling (same stem, `.parquet`) is preferred over the GeoJSON
+when present; create them once with `geodata_to_parquet` or
+`python -m backend.hazard_model --to-parquet`.
+
 Tuning weights:
-    Adjust `WEIGHTS` dict or read from env vars.
+    Adjust `WEIGHTS` dict or set env vars `SHELTR_W1` … `SHELTR_W5`. Weights
+    are baked into the combination kernels at import, so change them before
+    this module is loaded.
 """
 from __future__ import annotations
 
 from pathlib import Path
 from typing import Dict
 
-import math
-import random
+import os
 
+import numpy as np
+import shapely
 from shapely.geometry import LineString, Point
-from shapely.ops import nearest_points
+from shapely.strtree import STRtree
 
 try:
     import geopandas as gpd
@@ -50,17 +57,62 @@ DATA_DIR = Path(__file__).parent / "data"
 
 # ----------------------------- load vector layers ---------------------------
 
+VECTOR_LAYERS = (
+    "structural_risk.geojson",
+    "liquefaction.geojson",
+    "blocked_roads.geojson",
+    "shelters.geojson",
+)
+
+
 def _load_vector(name: str):
     if gpd is None:
         return None
     path = DATA_DIR / name
-    return gpd.read_file(path) if path.exists() else None
+    parquet_path = path.with_suffix(".parquet")
+    if parquet_path.exists():
+        return gpd.read_parquet(parquet_path)
+    return gpd.read_file(path, engine="pyogrio") if path.exists() else None
+
+
+def geodata_to_parquet(name: str) -> Path | None:
+    """Convert a vector layer in `DATA_DIR` to a GeoParquet sibling.
+
+    Returns the written path, or None if the source file does not exist.
+    """
+    path = DATA_DIR / name
+    if gpd is None or not path.exists():
+        return None
+    parquet_path = path.with_suffix(".parquet")
+    gpd.read_file(path, engine="pyogrio").to_parquet(parquet_path)
+    return parquet_path
+
 
 _struct_risk_gdf = _load_vector("structural_risk.geojson")
 _liquefaction_gdf = _load_vector("liquefaction.geojson")
 _blocked_gdf = _load_vector("blocked_roads.geojson")
 _shelters_gdf = _load_vector("shelters.geojson")
 
+# ----------------------------- spatial indices ------------------------------
+# Built once at import so each per-edge lookup is a tree query instead of a
+# linear scan over the whole layer.
+
+def _build_tree(gdf) -> STRtree | None:
+    if gdf is None or gdf.empty:
+        return None
+    return STRtree(gdf.geometry.to_numpy())
+
+_struct_tree = _build_tree(_struct_risk_gdf)
+_liquefaction_tree = _build_tree(_liquefaction_gdf)
+_blocked_tree = _build_tree(_blocked_gdf)
+_shelters_tree = _build_tree(_shelters_gdf)
+
+# positional `risk` values aligned with the structural tree's indices
+if _struct_tree is not None and "risk" in _struct_risk_gdf.columns:
+    _struct_risk_values = _struct_risk_gdf["risk"].to_numpy(dtype=float)
+else:
+    _struct_risk_values = None
+
 # ----------------------------- load raster ----------------------------------
 if rasterio is not None:
     pop_path = DATA_DIR / "population_density.tif"
@@ -68,6 +120,17 @@ if rasterio is not None:
 else:
     _pop_ds = None
 
+# band 1 is read lazily once and kept in memory; per-pixel lookups then index
+# this array instead of re-reading the band from disk.
+_pop_band = None
+
+
+def _population_band() -> np.ndarray:
+    global _pop_band
+    if _pop_band is None:
+        _pop_band = _pop_ds.read(1)
+    return _pop_band
+
 # ----------------------------- weights --------------------------------------
 WEIGHTS: Dict[str, float] = {
     "w1": 0.30,  # Structural risk
@@ -76,10 +139,34 @@ WEIGHTS: Dict[str, float] = {
     "w4": 0.15,  # Population density
     "w5": 0.10,  # Distance to safe zone
 }
+for _name in WEIGHTS:
+    if os.getenv(f"SHELTR_{_name.upper()}"):
+        WEIGHTS[_name] = float(os.environ[f"SHELTR_{_name.upper()}"])
 
-# ----------------------------- helpers --------------------------------------
 
-_random = random.Random(42)
+def _specialize_kernels(weights: Dict[str, float]):
+    """Build the factor-combination kernels with *weights* as constants.
+
+    Returns ``(combine_scalar, combine_bulk)``. The weights are closed over
+    rather than looked up per call, so the scalar version is a straight
+    multiply-add chain; the bulk version is one numpy expression, which is
+    already memory-bound and needs no JIT warm-up per process.
+    """
+    w1, w2, w3, w4, w5 = (float(weights[k]) for k in ("w1", "w2", "w3", "w4", "w5"))
+
+    def combine_scalar(a, b, c, d, e, w1=w1, w2=w2, w3=w3, w4=w4, w5=w5):
+        return max(0.0, min(1.0, w1 * a + w2 * b + w3 * c + w4 * d + w5 * e))
+
+    def combine_bulk(struct, liq, block, pop, shelter):
+        return np.clip(w1 * struct + w2 * liq + w3 * block + w4 * pop + w5 * shelter, 0.0, 1.0)
+
+    return combine_scalar, combine_bulk
+
+
+# weighted sum clamped to [0, 1]: per edge, and over arrays of edges
+_combine_scalar, _combine = _specialize_kernels(WEIGHTS)
+
+# ----------------------------- helpers --------------------------------------
 
 def _norm(val: float, min_v: float, max_v: float) -> float:
     """Clamp then normalise to [0, 1]."""
@@ -89,37 +176,47 @@ def _norm(val: float, min_v: float, max_v: float) -> float:
 
 
 def _structural_risk(ls: LineString) -> float:
-    if _struct_risk_gdf is None:
+    if _struct_tree is None:
         return 0.0
-    intersecting = _struct_risk_gdf[_struct_risk_gdf.intersects(ls)]
-    if intersecting.empty:
+    idxs = _struct_tree.query(ls, predicate="intersects")
+    if idxs.size == 0:
         return 0.0
     # average provided risk field if present else assume 1.0
-    if "risk" in intersecting.columns:
-        return float(intersecting["risk"].mean())
+    if _struct_risk_values is not None:
+        return float(_struct_risk_values[idxs].mean())
     return 1.0
 
 
 def _liquefaction_risk(ls: LineString) -> float:
-    if _liquefaction_gdf is None:
+    if _liquefaction_tree is None:
         return 0.0
-    return 1.0 if not _liquefaction_gdf[_liquefaction_gdf.intersects(ls)].empty else 0.0
+    return 1.0 if _liquefaction_tree.query(ls, predicate="intersects").size > 0 else 0.0
 
 
 def _blockage_status(ls: LineString) -> float:
-    if _blocked_gdf is None:
+    if _blocked_tree is None:
         return 0.0
-    return 1.0 if not _blocked_gdf[_blocked_gdf.intersects(ls)].empty else 0.0
+    return 1.0 if _blocked_tree.query(ls, predicate="intersects").size > 0 else 0.0
+
+
+def _midpoint(ls: LineString) -> tuple[float, float]:
+    """Midpoint of the segment's endpoints.
+
+    Graph edges are built as straight two-point segments, where this equals
+    the arc-length midpoint without a GEOS call.
+    """
+    (x0, y0), (x1, y1) = ls.coords[0], ls.coords[-1]
+    return 0.5 * (x0 + x1), 0.5 * (y0 + y1)
 
 
 def _population_density(ls: LineString) -> float:
     if _pop_ds is None:
         return 0.0
     # sample midpoint
-    midpt: Point = ls.interpolate(0.5, normalized=True)
+    mid_x, mid_y = _midpoint(ls)
     try:
-        row, col = _pop_ds.index(midpt.x, midpt.y)
-        density = _pop_ds.read(1)[row, col]
+        row, col = _pop_ds.index(mid_x, mid_y)
+        density = _population_band()[row, col]
         # Assume 0-10,000 persons/km² typical range -> normalise
         return _norm(density, 0, 10000)
     except Exception:  # pragma: no cover – coords outside raster etc.
@@ -127,14 +224,71 @@ def _population_density(ls: LineString) -> float:
 
 
 def _dist_to_safe_zone(ls: LineString) -> float:
-    if _shelters_gdf is None or _shelters_gdf.empty:
+    if _shelters_tree is None:
         return 0.0
-    midpt: Point = ls.interpolate(0.5, normalized=True)
-    # find nearest shelter (cheap linear scan since low counts)
-    nearest = _shelters_gdf.geometry.distance(midpt).min()
+    midpt = Point(_midpoint(ls))
+    # nearest shelter via the tree; distances are returned alongside indices
+    _, dists = _shelters_tree.query_nearest(midpt, return_distance=True, all_matches=False)
+    nearest = float(dists.min())
     # normalise: 0m -> 0 risk, ≥1000m -> 1 risk
     return _norm(nearest, 0, 1000)
 
+# ----------------------------- bulk variants --------------------------------
+# Same factors as above over an array of N edges; each tree is queried once
+# with the whole array so the predicate loop runs inside GEOS.
+
+def _norm_array(vals: np.ndarray, min_v: float, max_v: float) -> np.ndarray:
+    """Vectorised `_norm`."""
+    if max_v == min_v:
+        return np.zeros_like(vals, dtype=float)
+    return np.clip((vals - min_v) / (max_v - min_v), 0.0, 1.0)
+
+
+def _hit_mask(tree: STRtree | None, geoms: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(geoms))
+    if tree is None:
+        return out
+    # (2, M) array of (input_idx, tree_idx) pairs
+    hits = tree.query(geoms, predicate="intersects")
+    out[hits[0]] = 1.0
+    return out
+
+
+def _structural_risk_bulk(geoms: np.ndarray) -> np.ndarray:
+    n = len(geoms)
+    if _struct_tree is None:
+        return np.zeros(n)
+    hits = _struct_tree.query(geoms, predicate="intersects")
+    counts = np.bincount(hits[0], minlength=n)
+    if _struct_risk_values is None:
+        return (counts > 0).astype(float)
+    sums = np.bincount(hits[0], weights=_struct_risk_values[hits[1]], minlength=n)
+    return np.divide(sums, counts, out=np.zeros(n), where=counts > 0)
+
+
+def _population_density_bulk(mid_x: np.ndarray, mid_y: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(mid_x))
+    if _pop_ds is None:
+        return out
+    band = _population_band()
+    rows, cols = rasterio.transform.rowcol(_pop_ds.transform, mid_x, mid_y)
+    rows, cols = np.asarray(rows), np.asarray(cols)
+    # coords outside the raster keep density 0
+    inside = (rows >= 0) & (rows < band.shape[0]) & (cols >= 0) & (cols < band.shape[1])
+    out[inside] = band[rows[inside], cols[inside]]
+    # Assume 0-10,000 persons/km² typical range -> normalise
+    return _norm_array(out, 0, 10000)
+
+
+def _dist_to_safe_zone_bulk(mid_x: np.ndarray, mid_y: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(mid_x))
+    if _shelters_tree is None:
+        return out
+    midpts = shapely.points(mid_x, mid_y)
+    idxs, dists = _shelters_tree.query_nearest(midpts, return_distance=True, all_matches=False)
+    out[idxs[0]] = dists
+    return _norm_array(out, 0, 1000)
+
 # ----------------------------- main function --------------------------------
 
 def compute_edge_risk(linestring: LineString, length: float) -> float:  # noqa: D401
@@ -147,28 +301,48 @@ def compute_edge_risk(linestring: LineString, length: float) -> float:  # noqa:
     length : float
         Segment length in metres (can be used for normalisation if needed).
     """
-    factors = {
-        "Structural_Risk": _structural_risk(linestring),
-        "Liquefaction_Risk": _liquefaction_risk(linestring),
-        "Blockage_Status": _blockage_status(linestring),
-        "Population_Density": _population_density(linestring),
-        "Distance_to_Safe_Zone": _dist_to_safe_zone(linestring),
-    }
-
-    risk = (
-        WEIGHTS["w1"] * factors["Structural_Risk"] +
-        WEIGHTS["w2"] * factors["Liquefaction_Risk"] +
-        WEIGHTS["w3"] * factors["Blockage_Status"] +
-        WEIGHTS["w4"] * factors["Population_Density"] +
-        WEIGHTS["w5"] * factors["Distance_to_Safe_Zone"]
+    return _combine_scalar(
+        _structural_risk(linestring),
+        _liquefaction_risk(linestring),
+        _blockage_status(linestring),
+        _population_density(linestring),
+        _dist_to_safe_zone(linestring),
     )
 
-    # Clamp to [0,1]
-    return max(0.0, min(1.0, risk))
+
+def compute_edge_risk_bulk(start_xy: np.ndarray, end_xy: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Vectorised `compute_edge_risk` over an array of straight edges.
+
+    Parameters
+    ----------
+    start_xy, end_xy : ndarray of float, shape (N, 2)
+        (lon, lat) endpoints of the road segments.
+    lengths : ndarray of float, shape (N,)
+        Segment lengths in metres.
+    """
+    # segment geometries only for the intersect tests; midpoint-sampled
+    # factors work on plain coordinate arrays
+    linestrings = shapely.linestrings(np.stack([start_xy, end_xy], axis=1))
+    mid_x = 0.5 * (start_xy[:, 0] + end_xy[:, 0])
+    mid_y = 0.5 * (start_xy[:, 1] + end_xy[:, 1])
+    return _combine(
+        _structural_risk_bulk(linestrings),
+        _hit_mask(_liquefaction_tree, linestrings),
+        _hit_mask(_blocked_tree, linestrings),
+        _population_density_bulk(mid_x, mid_y),
+        _dist_to_safe_zone_bulk(mid_x, mid_y),
+    )
 
 
 # ----------------------------- CLI (debug) ----------------------------------
 if __name__ == "__main__":
+    import sys
+
+    if "--to-parquet" in sys.argv:
+        for layer in VECTOR_LAYERS:
+            print(layer, "->", geodata_to_parquet(layer))
+        sys.exit(0)
+
     # quick self-test with a random segment in Pune (lon,lat)
     test_ls = LineString([(73.85, 18.45), (73.86, 18.46)])
     print("Risk:", compute_edge_risk(test_ls, 100))
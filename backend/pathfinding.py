@@ -0,0 +1,171 @@
+"""Heap-based path searches over CSR adjacency arrays.
+
+The graph is given as the three flat arrays of a CSR matrix (`indptr`,
+`indices`, `weights`) and nodes are dense integer indices, so the loops below
+never touch NetworkX dicts. `routing.py` translates indices back to OSM node
+IDs.
+
+`potential` is an admissible lower bound on the remaining cost to the target
+for every node (e.g. ALT landmark bounds); pass zeros for plain Dijkstra.
+Banning edges or nodes only lengthens paths, so a potential computed on the
+full graph stays admissible for every spur search in `yen_k_shortest`.
+
+All functions are compiled with Numba (``nogil``, so threaded workers run
+searches in parallel); without Numba they run unchanged as plain Python.
+"""
+from __future__ import annotations
+
+import heapq
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover – optional dependency
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
+
+@njit(cache=True, nogil=True)
+def _walk(pred: np.ndarray, src: int, dst: int) -> np.ndarray:
+    """Follow predecessors from *dst* back to *src*."""
+    n = 1
+    v = dst
+    while v != src:
+        v = pred[v]
+        n += 1
+    path = np.empty(n, dtype=np.int64)
+    v = dst
+    for i in range(n - 1, -1, -1):
+        path[i] = v
+        v = pred[v]
+    return path
+
+
+@njit(cache=True, nogil=True)
+def _edge_id(indptr: np.ndarray, indices: np.ndarray, u: int, v: int) -> int:
+    for e in range(indptr[u], indptr[u + 1]):
+        if indices[e] == v:
+            return e
+    return -1
+
+
+@njit(cache=True, nogil=True)
+def _contains(paths, path: np.ndarray) -> bool:
+    for p in paths:
+        if len(p) == len(path) and np.all(p == path):
+            return True
+    return False
+
+
+@njit(cache=True, nogil=True)
+def astar(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    weights: np.ndarray,
+    src: int,
+    dst: int,
+    potential: np.ndarray,
+    banned_edges: np.ndarray,
+    banned_nodes: np.ndarray,
+):
+    """Cheapest *src* → *dst* path avoiding banned edges/nodes.
+
+    Returns ``(cost, path)``; ``cost`` is ``inf`` and ``path`` empty when
+    *dst* is unreachable.
+    """
+    n = len(indptr) - 1
+    dist = np.full(n, np.inf)
+    pred = np.full(n, -1, dtype=np.int64)
+    done = np.zeros(n, dtype=np.bool_)
+    dist[src] = 0.0
+    heap = [(potential[src], np.int64(src))]
+    while len(heap) > 0:
+        _, u = heapq.heappop(heap)
+        if done[u]:
+            continue
+        if u == dst:
+            break
+        done[u] = True
+        du = dist[u]
+        for e in range(indptr[u], indptr[u + 1]):
+            v = np.int64(indices[e])
+            if banned_edges[e] or banned_nodes[v] or done[v]:
+                continue
+            nd = du + weights[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(heap, (nd + potential[v], v))
+    if not np.isfinite(dist[dst]):
+        return np.inf, np.empty(0, dtype=np.int64)
+    return dist[dst], _walk(pred, src, dst)
+
+
+@njit(cache=True, nogil=True)
+def yen_k_shortest(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    weights: np.ndarray,
+    src: int,
+    dst: int,
+    k: int,
+    potential: np.ndarray,
+):
+    """Yen's algorithm: up to *k* loopless paths in increasing cost order.
+
+    Returns ``(paths, costs)`` as parallel lists of node-index arrays and
+    floats; both are empty when *dst* is unreachable.
+    """
+    n = len(indptr) - 1
+    banned_edges = np.zeros(len(indices), dtype=np.bool_)
+    banned_nodes = np.zeros(n, dtype=np.bool_)
+
+    cost, path = astar(indptr, indices, weights, src, dst, potential, banned_edges, banned_nodes)
+    paths = []
+    costs = []
+    if not np.isfinite(cost):
+        return paths, costs
+    paths.append(path)
+    costs.append(cost)
+
+    cand_paths = []
+    cand_costs = []
+    while len(paths) < k:
+        last = paths[-1]
+        root_cost = 0.0
+        for i in range(len(last) - 1):
+            spur = last[i]
+            banned_edges[:] = False
+            banned_nodes[:] = False
+            # drop the next edge of every accepted path sharing this root
+            for p in paths:
+                if len(p) > i + 1 and np.all(p[: i + 1] == last[: i + 1]):
+                    e = _edge_id(indptr, indices, p[i], p[i + 1])
+                    if e >= 0:
+                        banned_edges[e] = True
+            # keep the spur path loopless
+            for j in range(i):
+                banned_nodes[last[j]] = True
+
+            spur_cost, spur_path = astar(
+                indptr, indices, weights, spur, dst, potential, banned_edges, banned_nodes
+            )
+            if np.isfinite(spur_cost):
+                total = np.concatenate((last[:i], spur_path))
+                if not _contains(cand_paths, total) and not _contains(paths, total):
+                    cand_paths.append(total)
+                    cand_costs.append(root_cost + spur_cost)
+            root_cost += weights[_edge_id(indptr, indices, last[i], last[i + 1])]
+
+        if len(cand_paths) == 0:
+            break
+        best = int(np.argmin(np.array(cand_costs)))
+        paths.append(cand_paths[best])
+        costs.append(cand_costs[best])
+        # candidate order is irrelevant: swap the winner out with the tail
+        cand_paths[best] = cand_paths[-1]
+        cand_costs[best] = cand_costs[-1]
+        cand_paths.pop()
+        cand_costs.pop()
+    return paths, costs
@@ -3,21 +3,32 @@ Build and cache an OSM road network graph enriched with safety-centric risk weig
 """
 from __future__ import annotations
 
-import json
-import random
+import hashlib
+import os
+import pickle
+import threading
+import time
 from pathlib import Path
 import math
-from shapely.geometry import LineString, mapping
+from shapely.geometry import LineString
 
 # Import hazard model
 try:
     from . import hazard_model
 except ImportError:
     hazard_model = None
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
 from typing import List, Tuple
 
 import networkx as nx
+import orjson
 import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from .pathfinding import yen_k_shortest
 
 try:
     import osmnx as ox
@@ -32,6 +43,11 @@ try:
 except ImportError:  # pragma: no cover
     gpd = None  # geopandas is optional but recommended
 
+try:
+    import zstandard
+except ImportError:  # pragma: no cover – optional dependency
+    zstandard = None
+
 
 # ---------------------------------------------------------------------------
 # Constants & configuration
@@ -45,59 +61,405 @@ BBOX_MARGIN_DEGREES = 0.02
 LENGTH_WEIGHT = 1.0          # metres weight in overall cost
 RISK_PENALTY_WEIGHT = 500.0  # penalty per unit risk (tune higher to favour safety)
 
+# Mean Earth radius (metres) for the equirectangular projection.
+EARTH_RADIUS_M = 6371000.0
+
+# Number of ALT landmarks precomputed per cached graph.
+ALT_LANDMARKS = 8
+
+# Route results are memoised on coordinates rounded to this many decimals
+# (4 dp ≈ 11 m), so repeat clicks from the UI skip the search entirely.
+ROUTE_CACHE_DECIMALS = 4
+ROUTE_CACHE_SIZE = 4096
+
+# At most this many enriched graphs are kept on disk; the oldest go first.
+GRAPH_CACHE_MAX_FILES = int(os.getenv("SHELTR_GRAPH_CACHE_MAX_FILES", "8"))
+
+
+@dataclass
+class _RoutingGraph:
+    """Everything derived from one bbox's enriched street network.
+
+    Dense node indices ``0..N-1`` index every array below; ``node_ids`` maps
+    them back to OSM node IDs and ``node_index`` the other way.
+    """
+
+    multi: nx.MultiDiGraph
+    simple: nx.DiGraph           # lowest-risk edge per (u, v)
+    csr: csr_matrix              # risk_weight adjacency matching ``simple``
+    node_ids: np.ndarray
+    node_index: dict[int, int]
+    node_x: np.ndarray
+    node_y: np.ndarray
+    cos_lat0: float
+    node_tree: cKDTree           # over `_project`ed node coordinates
+    landmark_from: np.ndarray    # (L, N) distances landmark -> node
+    landmark_to: np.ndarray      # (L, N) distances node -> landmark
+    csr_undirected: csr_matrix | None = None
+    # serialised /riskmap bytes per requested (rounded) bbox
+    riskmap_geojson: dict[Tuple[float, ...], bytes] = field(default_factory=dict)
+
+
 # ---------------------------------------------------------------------------
 # In-memory cache to avoid rebuilding graphs for the same bounding box.
 # Keyed by (north, south, east, west) rounded to 4 dp.
 # ---------------------------------------------------------------------------
-_graph_cache: dict[Tuple[float, float, float, float], nx.MultiDiGraph] = {}
+_graph_cache: dict[Tuple[float, float, float, float], _RoutingGraph] = {}
+# Serialises misses: threaded workers must not walk the cache while another
+# thread inserts, nor download and persist the same bbox twice.
+_graph_cache_lock = threading.Lock()
+# The subset of `_graph_cache` that was built or loaded rather than served by
+# containment, so the containment scan does not grow with every alias key.
+_built_graphs: dict[Tuple[float, float, float, float], _RoutingGraph] = {}
+
+# Enriched graphs are also pickled here (zstd-compressed when `zstandard` is
+# installed) so a cold process start skips the OSM download and enrichment.
+GRAPH_CACHE_DIR = Path(__file__).parent / "data" / ".cache"
 
 def _round_bbox(north: float, south: float, east: float, west: float) -> Tuple[float, float, float, float]:
     return tuple(round(x, 4) for x in (north, south, east, west))
 
 
+def round_coords(*coords: float) -> Tuple[float, ...]:
+    """Round coordinates to the precision used as route cache keys."""
+    return tuple(round(c, ROUTE_CACHE_DECIMALS) for c in coords)
+
+
 # ---------------------------------------------------------------------------
 # Graph construction & risk enrichment
 # ---------------------------------------------------------------------------
 
-def _build_graph(north: float, south: float, east: float, west: float) -> nx.MultiDiGraph:
-    """Download street network for the specified bbox and enrich with risk."""
+def _build_graph(north: float, south: float, east: float, west: float) -> _RoutingGraph:
+    """Return the cached routing graph for the bbox, building it on a miss."""
     key = _round_bbox(north, south, east, west)
-    if key in _graph_cache:
-        return _graph_cache[key]
+    rg = _graph_cache.get(key)
+    if rg is not None:
+        return rg
+    with _graph_cache_lock:
+        if key in _graph_cache:  # built by another thread while we waited
+            return _graph_cache[key]
+        # A graph covering a larger bbox serves this one too: the node set only
+        # grows, so every path inside the smaller bbox is still found.
+        rg = next((g for k, g in _built_graphs.items() if _bbox_contains(k, key)), None)
+        if rg is None:
+            rg = _load_persisted_graph(key)
+            if rg is None:
+                G, nodes = _enriched_graph(north, south, east, west)
+                rg = _routing_graph(G, *nodes, north, south)
+                _persist_graph(key, rg)
+            _built_graphs[key] = rg
+        _graph_cache[key] = rg
+    return rg
+
+
+def _bbox_contains(outer: Tuple[float, ...], inner: Tuple[float, ...]) -> bool:
+    """True if bbox *inner* lies within *outer*; both are (north, south, east, west)."""
+    return (
+        inner[0] <= outer[0] and inner[1] >= outer[1]
+        and inner[2] <= outer[2] and inner[3] >= outer[3]
+    )
+
+
+@lru_cache(maxsize=1)
+def _cache_fingerprint() -> str:
+    """Hash of everything besides the bbox that shapes an enriched graph.
+
+    Persisted graphs from older hazard data, weights or `_RoutingGraph`
+    layouts simply stop matching.
+    """
+    parts: list = [
+        [(f.name, str(f.type)) for f in fields(_RoutingGraph)],
+        LENGTH_WEIGHT,
+        RISK_PENALTY_WEIGHT,
+    ]
+    if hazard_model is not None:
+        parts.append(sorted(hazard_model.WEIGHTS.items()))
+        parts.extend(
+            (p.name, p.stat().st_mtime_ns)
+            for p in sorted(hazard_model.DATA_DIR.glob("*"))
+            if p.is_file()
+        )
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:12]
+
+
+def _persisted_graph_path(key: Tuple[float, ...]) -> Path:
+    suffix = ".pkl.zst" if zstandard is not None else ".pkl"
+    bbox = "_".join(str(x) for x in key)
+    return GRAPH_CACHE_DIR / f"graph_{_cache_fingerprint()}_{bbox}{suffix}"
+
+
+def _persisted_bbox(path: Path, prefix: str) -> Tuple[float, ...] | None:
+    """Parse the bbox out of a cache file name written by `_persisted_graph_path`."""
+    try:
+        bbox = tuple(float(x) for x in path.name[len(prefix):].split(".pkl")[0].split("_"))
+    except ValueError:
+        return None
+    return bbox if len(bbox) == 4 else None
 
-    # 1. Download the drivable street network from OSM.
-    G = ox.graph_from_bbox(north, south, east, west, network_type="drive")
 
-    # 2. Calculate a naive risk score for every edge. Replace this logic with
-    #    domain-specific computations that incorporate hazard zones, blockages,
-    #    etc. Risk is in [0,1].
-    rng = random.Random(42)  # deterministic for reproducibility
+def _load_persisted_graph(key: Tuple[float, ...]) -> _RoutingGraph | None:
+    """Load a pickled graph whose bbox equals or contains *key*, if any."""
+    prefix = f"graph_{_cache_fingerprint()}_"
+    for path in GRAPH_CACHE_DIR.glob(prefix + "*.pkl*"):
+        compressed = path.name.endswith(".zst")
+        if compressed and zstandard is None:
+            continue
+        bbox = _persisted_bbox(path, prefix)
+        if bbox is None or not _bbox_contains(bbox, key):
+            continue
+        try:
+            data = path.read_bytes()
+            if compressed:
+                data = zstandard.ZstdDecompressor().decompress(data)
+            rg = pickle.loads(data)
+        except Exception:  # corrupt / incompatible cache entry: rebuild
+            continue
+        if isinstance(rg, _RoutingGraph):
+            return rg
+    return None
+
 
-    # iterate over a list snapshot because we may remove edges
-    for u, v, k, data in list(G.edges(keys=True, data=True)):
-        # Skip bridges/tunnels assumed collapsed/unusable
-        if data.get("bridge") not in (None, "no") or data.get("tunnel") not in (None, "no"):
-            G.remove_edge(u, v, key=k)
+def _persist_graph(key: Tuple[float, ...], rg: _RoutingGraph) -> None:
+    data = pickle.dumps(rg, protocol=pickle.HIGHEST_PROTOCOL)
+    if zstandard is not None:
+        data = zstandard.ZstdCompressor(level=3).compress(data)
+    path = _persisted_graph_path(key)
+    try:
+        GRAPH_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # write-then-rename so concurrent workers never read a partial file
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+    except OSError:  # read-only deployment: in-memory cache still applies
+        return
+    _prune_persisted_graphs(key)
+
+
+def _prune_persisted_graphs(key: Tuple[float, ...]) -> None:
+    """Drop cache files made redundant by the graph just written for *key*.
+
+    Removes entries from other fingerprints, current ones whose bbox *key*
+    contains, temp files abandoned by crashed writers, and then the oldest
+    entries beyond `GRAPH_CACHE_MAX_FILES`.
+    """
+    prefix = f"graph_{_cache_fingerprint()}_"
+    keep = []
+    for path in GRAPH_CACHE_DIR.glob("graph_*"):
+        try:
+            if path.name.endswith(".tmp"):
+                # another worker may still be writing a fresh one
+                if time.time() - path.stat().st_mtime > 3600:
+                    path.unlink()
+                continue
+            if not path.name.startswith(prefix):
+                path.unlink()
+                continue
+            bbox = _persisted_bbox(path, prefix)
+            if bbox is not None and bbox != key and _bbox_contains(key, bbox):
+                path.unlink()
+                continue
+            keep.append((path.stat().st_mtime, path))
+        except OSError:  # removed concurrently by another worker
             continue
-        length = data.get("length", 1.0)
-        ls = LineString([
-            (G.nodes[u]["x"], G.nodes[u]["y"]),
-            (G.nodes[v]["x"], G.nodes[v]["y"]),
-        ])
-        # If a hazard model is available, use it; otherwise fallback to tiny random risk
-        if hazard_model is not None:
-            risk_score = hazard_model.compute_edge_risk(ls, length)
-        else:
-            risk_score = rng.random() * 0.05
-
-        # Extra penalty for bridges and tunnels unless explicitly cleared
-        if data.get("bridge") not in (None, "no") or data.get("tunnel") not in (None, "no"):
-            risk_score = max(risk_score, 0.8)  # treat as very risky
+    keep.sort(reverse=True)
+    for _, path in keep[GRAPH_CACHE_MAX_FILES:]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _node_arrays(G: nx.MultiDiGraph) -> Tuple[np.ndarray, dict[int, int], np.ndarray, np.ndarray]:
+    """Dense node numbering plus structure-of-arrays x/y coordinates.
+
+    Returns ``(node_ids, node_index, node_x, node_y)``; ``node_x[i]`` is the
+    longitude of OSM node ``node_ids[i]`` and ``node_index`` maps IDs to ``i``.
+    """
+    node_ids = np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes())
+    node_index = {n: i for i, n in enumerate(node_ids.tolist())}
+    node_x = np.fromiter((x for _, x in G.nodes(data="x")), dtype=float, count=len(node_ids))
+    node_y = np.fromiter((y for _, y in G.nodes(data="y")), dtype=float, count=len(node_ids))
+    return node_ids, node_index, node_x, node_y
+
+
+def _edge_endpoints(G: nx.MultiDiGraph, node_index: dict[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Dense (source, target) indices of every edge, in ``G.edges()`` order."""
+    n_edges = G.number_of_edges()
+    src = np.fromiter((node_index[u] for u, _ in G.edges()), dtype=np.int32, count=n_edges)
+    dst = np.fromiter((node_index[v] for _, v in G.edges()), dtype=np.int32, count=n_edges)
+    return src, dst
+
+
+def _enriched_graph(north: float, south: float, east: float, west: float):
+    """Download street network for the specified bbox and enrich with risk.
+
+    Returns the graph and its `_node_arrays`, which scoring already needed.
+    """
+    # 1. Download the drivable street network from OSM.
+    G = ox.graph_from_bbox(north, south, east, west, network_type="drive")
+
+    # 2. Calculate a risk score in [0,1] for every edge from the hazard model.
+    # Drop bridges/tunnels (assumed collapsed/unusable) in one pass up front,
+    # so everything below only touches survivors.
+    G.remove_edges_from([
+        (u, v, k) for u, v, k, data in G.edges(keys=True, data=True)
+        if data.get("bridge") not in (None, "no") or data.get("tunnel") not in (None, "no")
+    ])
+
+    edge_data = [data for _, _, data in G.edges(data=True)]
+    nodes = _node_arrays(G)
+    lengths = np.fromiter((data.get("length", 1.0) for data in edge_data), dtype=float, count=len(edge_data))
+
+    if hazard_model is None:
+        # No hazard model: zero risk, weight is plain length.
+        for data, length in zip(edge_data, lengths.tolist()):
+            data["risk_score"] = 0.0
+            data["risk_weight"] = length * LENGTH_WEIGHT
+        return G, nodes
+
+    # 3. Score all surviving edges in one vectorised pass: gather the straight
+    #    segment endpoints in bulk and hand them to the hazard model at once.
+    _, node_index, node_x, node_y = nodes
+    src, dst = _edge_endpoints(G, node_index)
+    start_xy = np.column_stack((node_x[src], node_y[src]))
+    end_xy = np.column_stack((node_x[dst], node_y[dst]))
+    risk_scores = hazard_model.compute_edge_risk_bulk(start_xy, end_xy, lengths)
+    risk_weights = lengths * LENGTH_WEIGHT + risk_scores * RISK_PENALTY_WEIGHT
+
+    # 4. Write attributes back; the loop only assigns.
+    for data, risk_score, risk_weight in zip(edge_data, risk_scores.tolist(), risk_weights.tolist()):
         data["risk_score"] = risk_score
-        data["risk_weight"] = length * LENGTH_WEIGHT + risk_score * RISK_PENALTY_WEIGHT
+        data["risk_weight"] = risk_weight
+
+    return G, nodes
 
-    _graph_cache[key] = G
-    return G
+
+def _routing_graph(
+    G: nx.MultiDiGraph,
+    node_ids: np.ndarray,
+    node_index: dict[int, int],
+    node_x: np.ndarray,
+    node_y: np.ndarray,
+    north: float,
+    south: float,
+) -> _RoutingGraph:
+    """Derive the simple graph, CSR adjacency and landmark tables from *G*."""
+    src, dst = _edge_endpoints(G, node_index)
+    weights = np.fromiter((w for _, _, w in G.edges(data="risk_weight")), dtype=float, count=len(src))
+    csr = _csr_from_arrays(src, dst, weights, len(node_ids))
+
+    # Convert MultiDiGraph to simple DiGraph keeping lowest-risk edge between each node pair
+    edges = nx.to_pandas_edgelist(G)
+    best = edges.loc[edges.groupby(["source", "target"])["risk_weight"].idxmin()]
+    edge_attr = [c for c in ("length", "risk_score", "risk_weight", "geometry") if c in best.columns]
+    simple = nx.from_pandas_edgelist(best, "source", "target", edge_attr=edge_attr, create_using=nx.DiGraph)
+    simple.add_nodes_from(G.nodes(data=True))
+
+    landmarks = _select_landmarks(csr, ALT_LANDMARKS)
+    # equirectangular scale for longitude; exact enough within a city bbox
+    cos_lat0 = math.cos(math.radians((north + south) / 2))
+    return _RoutingGraph(
+        multi=G,
+        simple=simple,
+        csr=csr,
+        node_ids=node_ids,
+        node_index=node_index,
+        node_x=node_x,
+        node_y=node_y,
+        cos_lat0=cos_lat0,
+        node_tree=cKDTree(_project(node_x, node_y, cos_lat0)),
+        landmark_from=dijkstra(csr, indices=landmarks),
+        landmark_to=dijkstra(csr.T.tocsr(), indices=landmarks),
+    )
+
+
+def _csr_from_arrays(src: np.ndarray, dst: np.ndarray, weights: np.ndarray, n: int) -> csr_matrix:
+    """CSR adjacency from edge arrays; parallel edges collapse to the lowest weight."""
+    # sort by (src, dst, weight) and keep the first (cheapest) edge per pair
+    order = np.lexsort((weights, dst, src))
+    src, dst, weights = src[order], dst[order], weights[order]
+    keep = np.ones(len(src), dtype=bool)
+    keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    src, dst, weights = src[keep], dst[keep], weights[keep]
+
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return csr_matrix((weights, dst.astype(np.int32), indptr), shape=(n, n))
+
+
+def _undirected_csr(rg: _RoutingGraph) -> csr_matrix:
+    """Lazily built adjacency ignoring one-way restrictions."""
+    if rg.csr_undirected is None:
+        coo = rg.csr.tocoo()
+        rg.csr_undirected = _csr_from_arrays(
+            np.concatenate((coo.row, coo.col)),
+            np.concatenate((coo.col, coo.row)),
+            np.concatenate((coo.data, coo.data)),
+            rg.csr.shape[0],
+        )
+    return rg.csr_undirected
+
+
+def _select_landmarks(csr: csr_matrix, count: int) -> List[int]:
+    """Farthest-first landmark selection using undirected risk-weighted distances."""
+    count = min(count, csr.shape[0])
+    if count == 0:
+        return []
+    min_dist = dijkstra(csr, directed=False, indices=0)
+    landmarks: list[int] = []
+    for _ in range(count):
+        # unreachable nodes (inf) are never picked
+        nxt = int(np.argmax(np.where(np.isfinite(min_dist), min_dist, -1.0)))
+        landmarks.append(nxt)
+        min_dist = np.minimum(min_dist, dijkstra(csr, directed=False, indices=nxt))
+    return landmarks
+
+
+def _alt_potential(rg: _RoutingGraph, target: int) -> np.ndarray:
+    """ALT lower bound on d(v, target) for every node v.
+
+    By the triangle inequality, for every landmark l:
+        d(v, t) >= d(l, t) - d(l, v)   and   d(v, t) >= d(v, l) - d(t, l)
+    Pairs with an infinite distance give no bound and contribute 0.
+    """
+    if rg.landmark_from.size == 0:
+        return np.zeros(len(rg.node_ids))
+    with np.errstate(invalid="ignore"):
+        fwd = rg.landmark_from[:, target][:, None] - rg.landmark_from
+        bwd = rg.landmark_to - rg.landmark_to[:, target][:, None]
+    fwd = np.where(np.isfinite(fwd), fwd, 0.0)
+    bwd = np.where(np.isfinite(bwd), bwd, 0.0)
+    return np.maximum(np.maximum(fwd, bwd).max(axis=0), 0.0)
+
+
+def _csgraph_path(rg: _RoutingGraph, orig: int, dest: int, directed: bool = True) -> List[int]:
+    """Dijkstra over the cached CSR adjacency between dense node indices.
+
+    Returns the path as dense node indices.
+    """
+    dist, pred = dijkstra(rg.csr, directed=directed, indices=orig, return_predecessors=True)
+    if not np.isfinite(dist[dest]):
+        raise nx.NetworkXNoPath(f"No path between {rg.node_ids[orig]} and {rg.node_ids[dest]}.")
+    path = [dest]
+    while path[-1] != orig:
+        path.append(pred[path[-1]])
+    return path[::-1]
+
+
+def _project(lon, lat, cos_lat0: float) -> np.ndarray:
+    """Equirectangular ("cheap ruler") projection of lon/lat to metres."""
+    scale = EARTH_RADIUS_M * math.pi / 180.0
+    return np.column_stack((np.asarray(lon) * cos_lat0 * scale, np.asarray(lat) * scale))
+
+
+def _nearest_nodes(rg: _RoutingGraph, lons: List[float], lats: List[float]) -> List[int]:
+    """Dense indices of the graph nodes closest to each (lon, lat) point.
+
+    One batched query against the cached KD-tree; ``ox.nearest_nodes`` would
+    rebuild a haversine BallTree on every call for unprojected graphs.
+    """
+    _, idx = rg.node_tree.query(_project(lons, lats, rg.cos_lat0))
+    return np.atleast_1d(idx).tolist()
 
 
 def load_hazard_zones() -> gpd.GeoDataFrame | None:
@@ -114,165 +476,192 @@ def load_hazard_zones() -> gpd.GeoDataFrame | None:
 # Public API
 # ---------------------------------------------------------------------------
 
-def _path_coords_and_risk(path_nodes, G):
-    """Convert list of nodes to (lat,lon) coords and accumulate risk.
+def _path_coords_and_risk(rg: _RoutingGraph, path_idx, G) -> Tuple[np.ndarray, float]:
+    """Convert a path of dense node indices to (lat,lon) coords and accumulate risk.
 
-    Works for both MultiDiGraph (edge data under key) and DiGraph (edge data dict).
+    Coordinates come back as a read-only float32 array of shape (L, 2), ready
+    for numpy-aware JSON serialisation. A float32 step grows with the value:
+    about 0.2 m for latitudes of 16–32°, 0.8 m for longitudes of 64–128° and
+    1.7 m beyond 128°, so polylines can sit visibly off the float64 risk-map
+    geometry. *G* supplies per-edge data: the simple DiGraph, or an
+    undirected view of it when one-way restrictions were relaxed.
     """
+    idx = np.asarray(path_idx, dtype=np.int64)
+    ids = rg.node_ids[idx].tolist()
+    node_coords = np.column_stack((rg.node_y[idx], rg.node_x[idx]))
     total_risk = 0.0
-    coords: list[tuple[float, float]] = []
-    for idx, (u, v) in enumerate(zip(path_nodes[:-1], path_nodes[1:])):
-        data = G.get_edge_data(u, v)
-        # MultiDiGraph returns {key: attr_dict}; DiGraph returns attr_dict directly
-        if data is None:
-            continue  # should not happen
-        if "risk_weight" in data:
-            edge = data  # DiGraph
-        else:
-            # pick the first key (lowest risk); values are attr_dicts
-            first_key = next(iter(data))
-            edge = data[first_key]
+    pieces: list[np.ndarray] = []
+    run_start = 0  # first row of node_coords not yet emitted
+    for i, (u, v) in enumerate(zip(ids[:-1], ids[1:])):
+        edge = G[u][v]
         total_risk += edge.get("risk_weight", 0.0)
 
-        if "geometry" in edge:
-            seg = [(lat, lon) for lon, lat in edge["geometry"].coords]
-        else:
-            seg = [
-                (G.nodes[u]["y"], G.nodes[u]["x"]),
-                (G.nodes[v]["y"], G.nodes[v]["x"]),
-            ]
-        # avoid duplicating vertices between segments
-        if idx > 0:
-            seg = seg[1:]
-        coords.extend(seg)
+        # edges without their own geometry carry NaN after the pandas round-trip
+        geom = edge.get("geometry")
+        if isinstance(geom, LineString):
+            # nodes up to u, then the edge's interior vertices as (lat, lon)
+            pieces.append(node_coords[run_start:i + 1])
+            pieces.append(np.asarray(geom.coords)[1:-1, ::-1])
+            run_start = i + 1
+    pieces.append(node_coords[run_start:])
+    coords = np.concatenate(pieces).astype(np.float32)
+    coords.flags.writeable = False  # shared through the route caches
     return coords, float(total_risk)
 
 
-
 def alternative_routes(
     start_lat: float,
     start_lon: float,
     end_lat: float,
     end_lon: float,
     k: int = 5,
-) -> List[Tuple[List[Tuple[float, float]], float]]:
-    """Return up to *k* safest distinct routes sorted by risk."""
+) -> List[Tuple[np.ndarray, float]]:
+    """Return up to *k* safest distinct routes sorted by risk.
+
+    Results are memoised on coordinates rounded to `ROUTE_CACHE_DECIMALS`.
+    """
+    return _alternative_routes_cached(*round_coords(start_lat, start_lon, end_lat, end_lon), k)
+
+
+def _alternative_routes_impl(
+    start_lat: float,
+    start_lon: float,
+    end_lat: float,
+    end_lon: float,
+    k: int,
+) -> List[Tuple[np.ndarray, float]]:
     # Build graph and locate nodes similar to safest_route
     north = max(start_lat, end_lat) + BBOX_MARGIN_DEGREES
     south = min(start_lat, end_lat) - BBOX_MARGIN_DEGREES
     east = max(start_lon, end_lon) + BBOX_MARGIN_DEGREES
     west = min(start_lon, end_lon) - BBOX_MARGIN_DEGREES
-    G_multi = _build_graph(north, south, east, west)
-    orig = ox.nearest_nodes(G_multi, start_lon, start_lat)
-    dest = ox.nearest_nodes(G_multi, end_lon, end_lat)
-
-    # Convert MultiDiGraph to simple DiGraph keeping lowest-risk edge between each node pair
-    G = nx.DiGraph()
-    G.add_nodes_from(G_multi.nodes(data=True))
-
-    for u, v, data in G_multi.edges(data=True):
-        w = data["risk_weight"]
-        existing = G.get_edge_data(u, v)
-        if existing is None or w < existing["risk_weight"]:
-            # overwrite (or add) edge with lower risk weight and full attributes
-            G.add_edge(u, v, **data)
-
-    # Generate up to *k* simple paths ordered by total risk (Yen's algorithm)
-    try:
-        path_gen = nx.shortest_simple_paths(G, orig, dest, weight="risk_weight")
-        graph_for_path = G
-    except nx.NetworkXNoPath:
-        # fallback: ignore one-way restrictions using an undirected graph
-        G_u = G.to_undirected(as_view=False)
-        if not nx.has_path(G_u, orig, dest):
+    rg = _build_graph(north, south, east, west)
+    orig, dest = _nearest_nodes(rg, [start_lon, end_lon], [start_lat, end_lat])
+
+    # Yen's algorithm over the CSR arrays; spur searches are A* guided by the
+    # ALT landmark bounds towards *dest*.
+    csr = rg.csr
+    paths, _ = yen_k_shortest(csr.indptr, csr.indices, csr.data, orig, dest, k, _alt_potential(rg, dest))
+    graph_for_path = rg.simple
+    if not paths:
+        # fallback: ignore one-way restrictions; landmark bounds assume
+        # directed distances, so search without a potential
+        csr = _undirected_csr(rg)
+        paths, _ = yen_k_shortest(
+            csr.indptr, csr.indices, csr.data, orig, dest, k, np.zeros(csr.shape[0])
+        )
+        if not paths:
             raise ValueError("No viable evacuation path between the selected points.")
-        path_gen = nx.shortest_simple_paths(G_u, orig, dest, weight="risk_weight")
-        graph_for_path = G_u
+        graph_for_path = rg.simple.to_undirected(as_view=True)
 
-    routes: list[Tuple[List[Tuple[float, float]], float]] = []
-    for path_nodes in path_gen:
-        coords, risk = _path_coords_and_risk(path_nodes, graph_for_path)
+    routes: list[Tuple[np.ndarray, float]] = []
+    for path_idx in paths:
+        coords, risk = _path_coords_and_risk(rg, path_idx, graph_for_path)
         routes.append((coords, risk))
-        if len(routes) >= k:
-            break
-    # sort by risk ascending (generator already does, but to be sure)
+    # sort by risk ascending (Yen's already does, but to be sure)
     routes.sort(key=lambda x: x[1])
     return routes
 
 
+_alternative_routes_cached = lru_cache(maxsize=ROUTE_CACHE_SIZE)(_alternative_routes_impl)
+
+
 def safest_route(
     start_lat: float,
     start_lon: float,
     end_lat: float,
     end_lon: float,
-) -> Tuple[List[Tuple[float, float]], float]:
+) -> Tuple[np.ndarray, float]:
     """Compute the safest path between two coordinates.
 
+    Results are memoised on coordinates rounded to `ROUTE_CACHE_DECIMALS`.
+
     Returns
     -------
-    list of (lat, lon): Path coordinates for visualisation.
+    ndarray of (lat, lon), float32, shape (L, 2): Path coordinates for visualisation.
     float: Total accumulated risk weight.
     """
+    return _safest_route_cached(*round_coords(start_lat, start_lon, end_lat, end_lon))
+
+
+def _safest_route_impl(
+    start_lat: float,
+    start_lon: float,
+    end_lat: float,
+    end_lon: float,
+) -> Tuple[np.ndarray, float]:
     # Expand bbox with margin
     north = max(start_lat, end_lat) + BBOX_MARGIN_DEGREES
     south = min(start_lat, end_lat) - BBOX_MARGIN_DEGREES
     east = max(start_lon, end_lon) + BBOX_MARGIN_DEGREES
     west = min(start_lon, end_lon) - BBOX_MARGIN_DEGREES
 
-    G = _build_graph(north, south, east, west)
+    rg = _build_graph(north, south, east, west)
 
     # Map coords to nearest graph nodes
-    orig = ox.nearest_nodes(G, start_lon, start_lat)
-    dest = ox.nearest_nodes(G, end_lon, end_lat)
-
-    # NetworkX shortest path using risk_weight
-    def _heuristic(a: int, b: int) -> float:
-        # straight-line haversine distance (metres)
-        lat1, lon1 = G.nodes[a]["y"], G.nodes[a]["x"]
-        lat2, lon2 = G.nodes[b]["y"], G.nodes[b]["x"]
-        R = 6371000  # Earth radius metres
-        phi1, phi2 = math.radians(lat1), math.radians(lat2)
-        dphi = math.radians(lat2 - lat1)
-        dl = math.radians(lon2 - lon1)
-        h = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dl/2)**2
-        dist = 2*R*math.asin(math.sqrt(h))
-        # Minimum possible risk weight per metre
-        return dist * (1.0)
+    orig, dest = _nearest_nodes(rg, [start_lon, end_lon], [start_lat, end_lat])
 
+    # Dijkstra over the CSR adjacency runs entirely in C
+    graph_for_path = rg.simple
     try:
-        path_nodes = nx.astar_path(G, orig, dest, heuristic=_heuristic, weight="risk_weight")
+        path_nodes = _csgraph_path(rg, orig, dest)
     except nx.NetworkXNoPath:
-        # fallback: ignore one-way by using undirected graph
-        G_u = G.to_undirected(as_view=False)
+        # fallback: ignore one-way by treating the adjacency as undirected
         try:
-            path_nodes = nx.shortest_path(G_u, orig, dest, weight="risk_weight")
+            path_nodes = _csgraph_path(rg, orig, dest, directed=False)
         except nx.NetworkXNoPath as e:
             raise ValueError("No viable evacuation path between the selected points even after relaxing direction.") from e
+        graph_for_path = rg.simple.to_undirected(as_view=True)
 
-    path_coords, total_risk = _path_coords_and_risk(path_nodes, G)
+    path_coords, total_risk = _path_coords_and_risk(rg, path_nodes, graph_for_path)
     return path_coords, total_risk
 
 
-def risk_map_geojson(north: float, south: float, east: float, west: float) -> str:
-    """Return a GeoJSON FeatureCollection of edges with risk score attribute."""
-    G = _build_graph(north, south, east, west)
+_safest_route_cached = lru_cache(maxsize=ROUTE_CACHE_SIZE)(_safest_route_impl)
+
 
-    features = []
-    for u, v, k, data in G.edges(keys=True, data=True):
-        coords = [
-            (G.nodes[u]["x"], G.nodes[u]["y"]),
-            (G.nodes[v]["x"], G.nodes[v]["y"]),
-        ]
-        linestring = LineString(coords)
+def risk_map_geojson(north: float, south: float, east: float, west: float) -> bytes:
+    """Return a GeoJSON FeatureCollection of edges with risk score attribute.
+
+    Only edges with both endpoints inside the bbox are included, so a larger
+    cached graph reused for routing never leaks into the map. The serialised
+    bytes are cached with the graph per bbox, so repeated calls skip
+    serialisation entirely.
+    """
+    key = _round_bbox(north, south, east, west)
+    rg = _build_graph(north, south, east, west)
+    geojson = rg.riskmap_geojson.get(key)
+    if geojson is None:
+        geojson = rg.riskmap_geojson[key] = b"".join(_iter_risk_map_chunks(rg, key))
+    return geojson
+
+
+def _iter_risk_map_chunks(rg: _RoutingGraph, bbox: Tuple[float, ...]):
+    """Yield the FeatureCollection for *bbox* as bytes, one orjson-encoded feature at a time."""
+    G = rg.multi
+    north, south, east, west = bbox
+    src, dst = _edge_endpoints(G, rg.node_index)
+    inside = (rg.node_y <= north) & (rg.node_y >= south) & (rg.node_x <= east) & (rg.node_x >= west)
+    keep = (inside[src] & inside[dst]).tolist()
+    # (E, 2, 2) segment coordinates gathered from the node arrays in one go
+    lines = np.stack(
+        (rg.node_x[src], rg.node_y[src], rg.node_x[dst], rg.node_y[dst]), axis=-1
+    ).reshape(-1, 2, 2).tolist()
+    yield b'{"type":"FeatureCollection","features":['
+    first = True
+    for (_, _, data), line, kept in zip(G.edges(data=True), lines, keep):
+        if not kept:
+            continue
         feature = {
             "type": "Feature",
-            "geometry": mapping(linestring),
+            "geometry": {"type": "LineString", "coordinates": line},
             "properties": {
                 "risk_score": data.get("risk_score", 0.0),
                 "risk_weight": data.get("risk_weight", 0.0),
             },
         }
-        features.append(feature)
-
-    collection = {"type": "FeatureCollection", "features": features}
-    return json.dumps(collection)
+        if not first:
+            yield b","
+        first = False
+        yield orjson.dumps(feature)
+    yield b"]}"
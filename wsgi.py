@@ -0,0 +1,24 @@
+"""WSGI entry point for Sheltr: ``gunicorn --preload wsgi:app``.
+
+With ``--preload`` this module is imported once in the gunicorn master, so a
+graph warmed here is inherited by every forked worker (copy-on-write) instead
+of being downloaded and enriched once per worker.
+"""
+from __future__ import annotations
+
+import gc
+import os
+
+from backend.app import _default_bbox, app
+from backend.routing import risk_map_geojson
+
+# Opt-in: the default bbox falls back to the whole globe when SHELTR_NORTH/
+# SOUTH/EAST/WEST are unset, which is far too large to build on boot.
+if os.getenv("SHELTR_PRELOAD_GRAPH", "").lower() in ("1", "true", "yes"):
+    # builds and caches the default-bbox graph and its /riskmap payload
+    risk_map_geojson(*_default_bbox())
+    # move everything allocated so far out of the GC's reach so collections in
+    # workers do not touch (and un-share) the preloaded pages
+    gc.freeze()
+
+__all__ = ["app"]